@@ -0,0 +1,328 @@
+"""
+Shared helpers for the LLM scripts (test.py, semantic_cluster_test.py).
+
+Exact-match response cache: identical (model, system, user, temperature) requests
+are answered from ./.llm_cache instead of hitting the API again.
+
+Semantic cache: near-duplicate inputs (by embedding cosine similarity) with the same
+exact key reuse a previously stored result, persisted to semantic_cache.npz +
+semantic_cache.json.
+
+Clients: one OpenAI per API key, so calls share a keep-alive pool. Async clients are
+created per asyncio.run() (their pool is bound to the event loop) and run on aiohttp
+when `openai[aiohttp]` is installed.
+
+Retries: llm_retry retries rate limits, connection errors and 5xx with jittered
+exponential backoff, honouring Retry-After when the API sends one. llm_retry_submit
+retries only rate limits, for calls that must not run twice.
+"""
+
+import hashlib
+import importlib.util
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+import diskcache
+import httpx
+import numpy as np
+from openai import APIConnectionError, AsyncOpenAI, InternalServerError, OpenAI, RateLimitError
+from tenacity import RetryCallState, retry, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+
+
+# -----------------------------
+# Shared clients
+# -----------------------------
+
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=64)
+# httpx only speaks HTTP/2 when the optional h2 package is installed.
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+_clients: Dict[Optional[str], OpenAI] = {}
+
+
+def get_client(api_key: Optional[str] = None) -> OpenAI:
+    """
+    Returns the process-wide OpenAI client for api_key (default: OPENAI_API_KEY).
+    """
+    key = api_key or os.getenv("OPENAI_API_KEY")
+    client = _clients.get(key)
+    if client is None:
+        client = OpenAI(
+            api_key=key,
+            http_client=httpx.Client(http2=HTTP2, limits=HTTP_LIMITS),
+            max_retries=0,  # llm_retry owns retries
+        )
+        _clients[key] = client
+    return client
+
+
+def _async_http_client() -> httpx.AsyncClient:
+    # httpx's own async pool adds noticeable per-request overhead at high concurrency;
+    # the SDK's aiohttp-backed client avoids it. Falls back to httpx without the extra.
+    try:
+        from openai import DefaultAioHttpClient
+        return DefaultAioHttpClient(limits=HTTP_LIMITS)
+    except (ImportError, RuntimeError):
+        return httpx.AsyncClient(http2=HTTP2, limits=HTTP_LIMITS)
+
+
+def new_async_client(api_key: Optional[str] = None) -> AsyncOpenAI:
+    """
+    Builds an AsyncOpenAI client for one event loop. Not cached: its connection pool
+    is bound to the loop that first uses it, so reuse across asyncio.run() calls
+    fails with "Event loop is closed". Use as `async with new_async_client() as client:`.
+    """
+    key = api_key or os.getenv("OPENAI_API_KEY")
+    return AsyncOpenAI(api_key=key, http_client=_async_http_client(), max_retries=0)
+
+
+# -----------------------------
+# Retries
+# -----------------------------
+
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+RETRY_ATTEMPTS = 6
+RETRY_MAX_WAIT = 30.0
+
+_backoff = wait_exponential_jitter(initial=1, max=RETRY_MAX_WAIT)
+
+
+def _wait_retry_after(retry_state: RetryCallState) -> float:
+    exc = retry_state.outcome.exception() if retry_state.outcome else None
+    response = getattr(exc, "response", None)
+    if response is not None:
+        try:
+            return min(float(response.headers.get("retry-after", "")), RETRY_MAX_WAIT)
+        except ValueError:
+            pass  # missing, or an HTTP date; fall back to backoff
+    return _backoff(retry_state)
+
+
+# Works on both sync and async callables (tenacity picks the right runner).
+llm_retry = retry(
+    retry=retry_if_exception_type(RETRYABLE_ERRORS),
+    wait=_wait_retry_after,
+    stop=stop_after_attempt(RETRY_ATTEMPTS),
+    reraise=True,
+)
+
+# For non-idempotent calls (file uploads, batch submission): a timeout or 5xx may
+# mean the server already accepted the request, so only a 429 is safe to resend.
+llm_retry_submit = retry(
+    retry=retry_if_exception_type(RateLimitError),
+    wait=_wait_retry_after,
+    stop=stop_after_attempt(RETRY_ATTEMPTS),
+    reraise=True,
+)
+
+
+# -----------------------------
+# Exact-match response cache
+# -----------------------------
+
+CACHE_DIR = ".llm_cache"
+# Only cache (near-)deterministic calls; sampling at higher temperatures is intentional.
+CACHE_MAX_TEMPERATURE = 0.1
+
+T = TypeVar("T")
+
+_cache: Optional[diskcache.Cache] = None
+
+
+def _get_cache() -> diskcache.Cache:
+    global _cache
+    if _cache is None:
+        _cache = diskcache.Cache(CACHE_DIR)
+    return _cache
+
+
+def cache_key(model: str, payload: Dict[str, Any]) -> str:
+    """
+    payload: {"system": str, "user": str, "temperature": float | None}
+    """
+    blob = json.dumps(
+        {
+            "model": model,
+            "system": payload.get("system"),
+            "user": payload.get("user"),
+            "temperature": payload.get("temperature"),
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _is_cacheable(payload: Dict[str, Any]) -> bool:
+    # None = model default; our callers leave it unset only for extraction-style prompts.
+    temperature = payload.get("temperature")
+    return temperature is None or temperature <= CACHE_MAX_TEMPERATURE
+
+
+def cached_llm(
+    model: str,
+    payload: Dict[str, Any],
+    call: Callable[[], str],
+    parse: Callable[[str], T] = lambda s: s,
+    enabled: bool = True,
+) -> T:
+    """
+    Returns parse(text) for the cached response if present, else calls the model.
+    The raw text is stored only once parse() succeeds, so bad outputs are never cached.
+    """
+    if not enabled or not _is_cacheable(payload):
+        return parse(call())
+
+    cache = _get_cache()
+    key = cache_key(model, payload)
+    hit = cache.get(key)
+    if hit is not None:
+        return parse(hit)
+
+    text = call()
+    out = parse(text)
+    cache.set(key, text)
+    return out
+
+
+async def cached_llm_async(
+    model: str,
+    payload: Dict[str, Any],
+    call: Callable[[], Awaitable[str]],
+    parse: Callable[[str], T] = lambda s: s,
+    enabled: bool = True,
+) -> T:
+    """
+    Async variant of cached_llm.
+    """
+    if not enabled or not _is_cacheable(payload):
+        return parse(await call())
+
+    cache = _get_cache()
+    key = cache_key(model, payload)
+    hit = cache.get(key)
+    if hit is not None:
+        return parse(hit)
+
+    text = await call()
+    out = parse(text)
+    cache.set(key, text)
+    return out
+
+
+# -----------------------------
+# Semantic (embedding-similarity) cache
+# -----------------------------
+
+EMBED_MODEL = "text-embedding-3-small"
+EMBED_BATCH_SIZE = 2048  # API limit on inputs per embeddings request
+SEMANTIC_CACHE_PATH = "semantic_cache"  # -> semantic_cache.npz + semantic_cache.json
+SEMANTIC_THRESHOLD = 0.92
+SEMANTIC_MAX_ENTRIES = 5000
+
+
+def _normalize(vecs: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vecs / norms
+
+
+class SemanticCache:
+    """
+    Flat inner-product index over L2-normalized embeddings with parallel lists of
+    exact-match keys and JSON-able values. A lookup only considers entries whose key
+    equals the query's, so similarity decides between same-key candidates and never
+    maps one key onto another. Least-recently-used entries are evicted past max_entries.
+    """
+
+    def __init__(
+        self,
+        path: str = SEMANTIC_CACHE_PATH,
+        threshold: float = SEMANTIC_THRESHOLD,
+        max_entries: int = SEMANTIC_MAX_ENTRIES,
+    ) -> None:
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._emb: Optional[np.ndarray] = None   # (n, dim) float32, rows normalized
+        self._keys: List[str] = []
+        self._values: List[Dict[str, Any]] = []
+        self._last_used: List[int] = []
+        self._tick = 0
+        self._load()
+
+    def _load(self) -> None:
+        npz_path, json_path = f"{self.path}.npz", f"{self.path}.json"
+        if not (os.path.exists(npz_path) and os.path.exists(json_path)):
+            return
+        with open(json_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        emb = np.load(npz_path)["emb"]
+        if "keys" not in meta or not (len(emb) == len(meta["keys"]) == len(meta.get("values", []))):
+            # Out of sync (e.g. interrupted write) or an older keyless file; start fresh
+            # rather than mis-map.
+            return
+        self._emb = emb.astype(np.float32)
+        self._keys = meta["keys"]
+        self._values = meta["values"]
+        self._last_used = meta["last_used"]
+        self._tick = meta.get("tick", max(self._last_used, default=0))
+
+    def save(self) -> None:
+        if self._emb is None:
+            return
+        np.savez(f"{self.path}.npz", emb=self._emb)
+        with open(f"{self.path}.json", "w", encoding="utf-8") as f:
+            json.dump(
+                {"tick": self._tick, "keys": self._keys, "values": self._values, "last_used": self._last_used},
+                f,
+                ensure_ascii=False,
+            )
+
+    def lookup(self, vecs: np.ndarray, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        For each query embedding, returns the stored value of its nearest neighbour
+        among entries with the same key if cosine similarity >= threshold, else None.
+        """
+        if self._emb is None or not len(self._emb) or not len(vecs):
+            return [None] * len(vecs)
+
+        by_key: Dict[str, List[int]] = {}
+        for i, k in enumerate(self._keys):
+            by_key.setdefault(k, []).append(i)
+
+        queries = _normalize(np.asarray(vecs, dtype=np.float32))
+        out: List[Optional[Dict[str, Any]]] = []
+        for q, key in zip(queries, keys):
+            idxs = by_key.get(key)
+            if not idxs:
+                out.append(None)
+                continue
+            sims = self._emb[idxs] @ q
+            best = int(sims.argmax())
+            if sims[best] >= self.threshold:
+                ei = idxs[best]
+                self._tick += 1
+                self._last_used[ei] = self._tick
+                out.append(self._values[ei])
+            else:
+                out.append(None)
+        return out
+
+    def add(self, vecs: np.ndarray, keys: List[str], values: List[Dict[str, Any]]) -> None:
+        if not values:
+            return
+        vecs = _normalize(np.asarray(vecs, dtype=np.float32))
+        self._emb = vecs if self._emb is None or not len(self._emb) else np.vstack([self._emb, vecs])
+        self._keys.extend(keys)
+        for v in values:
+            self._tick += 1
+            self._values.append(v)
+            self._last_used.append(self._tick)
+
+        if len(self._values) > self.max_entries:
+            keep = sorted(np.argsort(self._last_used)[-self.max_entries:])
+            self._emb = self._emb[keep]
+            self._keys = [self._keys[i] for i in keep]
+            self._values = [self._values[i] for i in keep]
+            self._last_used = [self._last_used[i] for i in keep]
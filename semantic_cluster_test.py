@@ -2,16 +2,24 @@ import json
 import os
 from typing import Any, Dict, List
 
-from openai import OpenAI
+import orjson
+from dotenv import load_dotenv
+
+# Don't override already-set env vars.
+load_dotenv(override=False)
+
+from llm_utils import cached_llm, get_client, llm_retry
 
 
 """
 Usage:
   python3 -m venv .venv
   source .venv/bin/activate
-  pip install --upgrade openai
+  pip install --upgrade openai diskcache numpy orjson python-dotenv tenacity
   # Uses .env automatically if present (OPENAI_API_KEY / OPENAI_MODEL).
   python semantic_cluster_test.py
+  # Responses are cached in ./.llm_cache; pass --no_cache to force a fresh call.
+  python semantic_cluster_test.py --no_cache
 
 This script reads ./fields.json and asks the LLM to cluster semantically equivalent fields
 into canonical meanings (canonical_id). This is the "semantic interconnectedness" test.
@@ -47,24 +55,11 @@ Rules:
 
 
 def main() -> None:
-    # Load .env if present (minimal parser; no extra dependency).
-    if os.path.exists(".env"):
-        try:
-            with open(".env", "r", encoding="utf-8") as f:
-                for line in f:
-                    s = line.strip()
-                    if not s or s.startswith("#"):
-                        continue
-                    if "=" not in s:
-                        continue
-                    k, v = s.split("=", 1)
-                    k = k.strip()
-                    v = v.strip().strip('"').strip("'")
-                    # Don't override already-set env vars.
-                    if k and k not in os.environ:
-                        os.environ[k] = v
-        except Exception:
-            pass
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cluster fields.json into canonical meanings.")
+    parser.add_argument("--no_cache", action="store_true", help="Bypass the on-disk LLM response cache (.llm_cache)")
+    args = parser.parse_args()
 
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
@@ -87,23 +82,37 @@ def main() -> None:
             }
         )
 
-    client = OpenAI(api_key=api_key)
-    resp = client.chat.completions.create(
-        model=MODEL,
-        temperature=0.1,
-        messages=[
-            {"role": "system", "content": SYSTEM},
-            {"role": "user", "content": json.dumps({"fields": payload}, indent=2)},
-        ],
-    )
+    user = json.dumps({"fields": payload}, indent=2)
+    temperature = 0.1
+
+    @llm_retry
+    def _request() -> str:
+        resp = get_client(api_key).chat.completions.create(
+            model=MODEL,
+            temperature=temperature,
+            messages=[
+                {"role": "system", "content": SYSTEM},
+                {"role": "user", "content": user},
+            ],
+        )
+        return resp.choices[0].message.content or ""
 
-    raw = (resp.choices[0].message.content or "").strip()
-    try:
-        out = json.loads(raw)
-    except Exception:
-        print("MODEL OUTPUT (not JSON):")
-        print(raw)
-        raise
+    def _parse(raw: str) -> Dict[str, Any]:
+        raw = raw.strip()
+        try:
+            return orjson.loads(raw)
+        except Exception:
+            print("MODEL OUTPUT (not JSON):")
+            print(raw)
+            raise
+
+    out = cached_llm(
+        MODEL,
+        {"system": SYSTEM, "user": user, "temperature": temperature},
+        _request,
+        parse=_parse,
+        enabled=not args.no_cache,
+    )
 
     print(json.dumps(out, indent=2))
 
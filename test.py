@@ -2,32 +2,50 @@ from __future__ import annotations
 
 import os
 import re
-import json
+import asyncio
+import time
 import csv
+import zipfile
+import glob
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from typing import List, Dict, Any, Optional, Tuple
+from functools import partial
+from typing import TYPE_CHECKING, List, Dict, Any, Optional, Tuple
 
 from dotenv import load_dotenv
 load_dotenv()
 
-import pandas as pd
-from docx import Document
-from pydantic import BaseModel, Field, ValidationError
+import orjson
+from lxml import etree
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
 
-# OpenAI SDK (Responses API)
-from openai import OpenAI  # per official docs  [oai_citation:1‡OpenAI Platform](https://platform.openai.com/docs/overview?lang=python&utm_source=chatgpt.com)
+# The OpenAI SDK (Responses API), numpy and the cache helpers are imported inside the
+# LLM functions, so --no_llm runs only pay for detection.
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI  # per official docs  [oai_citation:1‡OpenAI Platform](https://platform.openai.com/docs/overview?lang=python&utm_source=chatgpt.com)
 
 
 # -----------------------------
 # 1) Deterministic field detection
 # -----------------------------
 
-BRACKET_TOKEN_RE = re.compile(r"\[[^\[\]\n]{1,120}\]")  # e.g. [Company Name]
-BRACKET_BLANK_RE = re.compile(r"\$\[[\s_]{3,}\]|\[[\s_]{3,}\]")  # e.g. $[_____]
-UNDERLINE_RE = re.compile(r"_{3,}")  # e.g. ________
-SIGNATURE_LABEL_RE = re.compile(r"^\s*(By:|Name:|Title:|Address:|Email:)\s*(.*)$", re.IGNORECASE)
-
-@dataclass
+# All detectors fused into one alternation so each line is scanned once.
+# bblk is tried before btok so "$[_____]" / "[_____]" are reported as blanks.
+PLACEHOLDER_RE = re.compile(
+    r"(?P<bblk>\$?\[[\s_]{3,}\])"               # e.g. $[_____]
+    r"|(?P<btok>\[[^\[\]\n]{1,120}\])"         # e.g. [Company Name]
+    r"|(?P<sig>^\s*(?i:By|Name|Title|Address|Email):)"  # e.g. By:
+    r"|(?P<ul>_{3,})"                         # e.g. ________
+)
+PLACEHOLDER_KINDS = {
+    "bblk": "bracket_blank",
+    "btok": "bracket_token",
+    "sig": "signature_label",
+    "ul": "underline",
+}
+
+@dataclass(slots=True)
 class DetectedField:
     raw_placeholder: str               # e.g. "[Company Name]" or "By:"
     kind: str                          # "bracket_token" | "bracket_blank" | "underline" | "signature_label"
@@ -38,75 +56,102 @@ class DetectedField:
     line_index: int                    # index in flattened lines
 
 
-def _iter_docx_lines(doc: Document) -> List[Tuple[str, str]]:
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_P, _W_R, _W_T, _W_TAB, _W_BR, _W_CR = (f"{W_NS}{t}" for t in ("p", "r", "t", "tab", "br", "cr"))
+# Run wrappers whose text belongs to the paragraph (links, tracked insertions).
+_W_RUN_CONTAINERS = (f"{W_NS}hyperlink", f"{W_NS}ins")
+
+
+def _paragraph_text(p: etree._Element) -> str:
+    # Same run-content mapping as python-docx: tabs -> "\t", line breaks -> "\n",
+    # page/column breaks dropped. Only direct run children are read, so text boxes
+    # (w:drawing / mc:AlternateContent inside a run) don't leak into the anchor paragraph.
+    parts: List[str] = []
+    for child in p:
+        if child.tag == _W_R:
+            runs = [child]
+        elif child.tag in _W_RUN_CONTAINERS:
+            runs = child.iterchildren(_W_R)
+        else:
+            continue
+        for r in runs:
+            for el in r.iterchildren(_W_T, _W_TAB, _W_BR, _W_CR):
+                if el.tag == _W_T:
+                    parts.append(el.text or "")
+                elif el.tag == _W_TAB:
+                    parts.append("\t")
+                elif el.tag == _W_CR or el.get(f"{W_NS}type", "textWrapping") == "textWrapping":
+                    parts.append("\n")
+    return "".join(parts)
+
+
+def _iter_docx_lines(path: str) -> List[Tuple[str, str]]:
     """
     Flatten doc into a list of (text, location_hint) from paragraphs + tables.
+    Reads word/document.xml straight from the zip in one lxml parse instead of going
+    through python-docx's per-paragraph/per-cell object model.
     """
+    with zipfile.ZipFile(path) as z:
+        root = etree.fromstring(z.read("word/document.xml"))
+    body = root.find(f"{W_NS}body")
+    if body is None:
+        return []
+
     lines: List[Tuple[str, str]] = []
 
     # Paragraphs
-    for i, p in enumerate(doc.paragraphs):
-        t = (p.text or "").strip()
+    for i, p in enumerate(body.iterchildren(_W_P)):
+        t = _paragraph_text(p).strip()
         if t:
             lines.append((t, f"paragraph:{i}"))
 
     # Tables
-    for ti, table in enumerate(doc.tables):
-        for ri, row in enumerate(table.rows):
-            for ci, cell in enumerate(row.cells):
-                cell_text = " ".join((cell.text or "").split())
+    for ti, table in enumerate(body.iterchildren(f"{W_NS}tbl")):
+        for ri, row in enumerate(table.iterchildren(f"{W_NS}tr")):
+            ci = 0  # grid column, so merged (gridSpan) cells keep later columns aligned
+            for tc in row.iterchildren(f"{W_NS}tc"):
+                cell_text = " ".join("\n".join(_paragraph_text(p) for p in tc.iterchildren(_W_P)).split())
                 if cell_text:
                     lines.append((cell_text, f"table:{ti} row:{ri} col:{ci}"))
+                span = tc.find(f"{W_NS}tcPr/{W_NS}gridSpan")
+                ci += int(span.get(f"{W_NS}val", "1")) if span is not None else 1
 
     return lines
 
 
 def detect_fields_from_docx(path: str, window: int = 1) -> List[DetectedField]:
-    doc = Document(path)
-    lines = _iter_docx_lines(doc)
-
-    detected: List[DetectedField] = []
-
-    for idx, (line, loc) in enumerate(lines):
-        before = lines[idx - window][0] if idx - window >= 0 else ""
-        after = lines[idx + window][0] if idx + window < len(lines) else ""
+    lines = _iter_docx_lines(path)
 
-        # 1) bracket tokens like [Company Name]
-        for m in BRACKET_TOKEN_RE.finditer(line):
-            detected.append(
-                DetectedField(
-                    raw_placeholder=m.group(0),
-                    kind="bracket_token",
-                    context_before=before,
-                    context_line=line,
-                    context_after=after,
-                    location_hint=loc,
-                    line_index=idx,
-                )
-            )
+    # Context columns are built once by shifting the text column, instead of
+    # re-indexing `lines` for every line; rows share the same str objects.
+    texts = [t for t, _ in lines]
+    locs = [loc for _, loc in lines]
+    n = len(texts)
+    before_col = ([""] * window + texts)[:n]
+    after_col = (texts[window:] + [""] * window)[:n]
 
-        # 2) bracket blanks like $[_____]
-        for m in BRACKET_BLANK_RE.finditer(line):
-            detected.append(
-                DetectedField(
-                    raw_placeholder=m.group(0),
-                    kind="bracket_blank",
-                    context_before=before,
-                    context_line=line,
-                    context_after=after,
-                    location_hint=loc,
-                    line_index=idx,
-                )
-            )
+    detected: List[DetectedField] = []
 
-        # 3) signature labels ("By:", "Name:", etc.) even without explicit underscores
-        sig = SIGNATURE_LABEL_RE.match(line)
-        if sig:
-            label = sig.group(1).strip()
+    for idx, (line, loc, before, after) in enumerate(zip(texts, locs, before_col, after_col)):
+        # Every pattern needs "[", "_" or ":"; skip plain prose without touching the regex.
+        if not ("[" in line or "_" in line or ":" in line):
+            continue
+        has_blank = has_underline = False
+        for m in PLACEHOLDER_RE.finditer(line):
+            group = m.lastgroup
+            if group == "ul":
+                has_underline = True
+                continue
+            has_blank = has_blank or group == "bblk"
+            # btok consumes any underscores inside it (e.g. "[Name ____]"); they still
+            # count as an underline, as with the old separate UNDERLINE_RE scan.
+            if group == "btok" and "___" in m.group(0):
+                has_underline = True
             detected.append(
                 DetectedField(
-                    raw_placeholder=label,
-                    kind="signature_label",
+                    # signature labels ("By:", "Name:", etc.) even without explicit underscores
+                    raw_placeholder=m.group(0).strip(),
+                    kind=PLACEHOLDER_KINDS[group],
                     context_before=before,
                     context_line=line,
                     context_after=after,
@@ -115,8 +160,8 @@ def detect_fields_from_docx(path: str, window: int = 1) -> List[DetectedField]:
                 )
             )
 
-        # 4) explicit underlines ________ that aren’t already inside bracket_blank
-        if UNDERLINE_RE.search(line) and not BRACKET_BLANK_RE.search(line):
+        # explicit underlines ________ that aren’t already inside bracket_blank
+        if has_underline and not has_blank:
             detected.append(
                 DetectedField(
                     raw_placeholder="__________",
@@ -137,6 +182,27 @@ def detect_fields_from_docx(path: str, window: int = 1) -> List[DetectedField]:
     return list(uniq.values())
 
 
+def detect_fields_from_docx_many(paths: List[str], window: int = 1) -> List[DetectedField]:
+    """
+    Runs detect_fields_from_docx over several files in worker processes (parsing +
+    regex are CPU-bound) and concatenates the results in input order.
+    With more than one file, location_hint is prefixed with the file name.
+    """
+    if len(paths) == 1:
+        return detect_fields_from_docx(paths[0], window=window)
+
+    with ProcessPoolExecutor(max_workers=min(len(paths), os.cpu_count() or 1)) as pool:
+        per_file = list(pool.map(partial(detect_fields_from_docx, window=window), paths))
+
+    detected: List[DetectedField] = []
+    for path, fields in zip(paths, per_file):
+        name = os.path.basename(path)
+        for d in fields:
+            d.location_hint = f"{name} {d.location_hint}"
+        detected.extend(fields)
+    return detected
+
+
 # -----------------------------
 # 2) LLM classification schema
 # -----------------------------
@@ -154,6 +220,10 @@ class LLMField(BaseModel):
     ask_user: bool
 
 
+# Validates a whole response list in one pass instead of LLMField(**obj) per item.
+_LLM_FIELD_LIST = TypeAdapter(List[LLMField])
+
+
 # -----------------------------
 # 3) OpenAI call (Responses API)
 # -----------------------------
@@ -163,7 +233,12 @@ You will receive detected placeholders with local context.
 Your job: infer what the field should be, who should fill it, and how to ask the user.
 
 Rules:
-- Output ONLY valid JSON: an array of objects matching the schema described.
+- Input is a schema, a `lines` table of document text, then numbered sections
+  "### item 0" ... "### item K-1", one placeholder each.
+- Each item's `context` is [before, line, after]: indices into `lines` (null = no such line).
+  Read the context from the table; quote evidence from those lines.
+- Output ONLY valid JSON: an object {"items": [...]} holding exactly K objects matching the schema,
+  one per input item, in the same order as the items.
 - Do NOT invent actual values. Only describe what should be entered.
 - The end-user is NOT the investor / NOT the paying party / NOT giving money.
   So if the placeholder is clearly for the counterparty (e.g., Investor name, Purchase Amount),
@@ -172,99 +247,407 @@ Rules:
 - If uncertain, set lower confidence and explain briefly in how_to_fill.
 """
 
-def call_openai_classify(detected: List[DetectedField], model: str = "gpt-5.2") -> List[LLMField]:
+CLASSIFY_CHUNK_SIZE = 20   # placeholders per request
+MAX_CONCURRENCY = 8        # in-flight requests; keep under the account's RPM limit
+
+
+CLASSIFY_SCHEMA: Dict[str, str] = {
+    "field_id": "string",
+    "raw_placeholder": "string",
+    "label_for_user": "string",
+    "who_should_fill": "company|counterparty|either|system",
+    "expected_type": "string|date|money|state|email|name|title|address|jurisdiction|other",
+    "how_to_fill": "string (1 sentence)",
+    "confidence": "number 0..1",
+    "evidence_quote": "string (short excerpt from provided context)",
+    "location_hint": "string",
+    "ask_user": "boolean"
+}
+
+
+def _build_user_input(detected: List[DetectedField]) -> str:
     """
-    Sends detected placeholders to OpenAI and expects JSON array back.
+    One message for K placeholders: the schema once, a table of the distinct context
+    lines once, then one numbered section per item referencing that table by index.
+    Neighbouring placeholders share context lines, so each line is sent only once.
     """
-    client = OpenAI()  # uses OPENAI_API_KEY env var  [oai_citation:2‡OpenAI Platform](https://platform.openai.com/docs/api-reference/introduction?utm_source=chatgpt.com)
+    table: Dict[str, int] = {}
 
-    payload_items: List[Dict[str, Any]] = []
-    for d in detected:
-        payload_items.append({
+    def ref(text: str) -> Optional[int]:
+        if not text:
+            return None
+        return table.setdefault(text, len(table))
+
+    items = [
+        {
             "raw_placeholder": d.raw_placeholder,
             "kind": d.kind,
             "location_hint": d.location_hint,
-            "context_before": d.context_before,
-            "context_line": d.context_line,
-            "context_after": d.context_after,
-        })
-
-    # We ask for strict JSON.
-    user_input = {
-        "schema": {
-            "field_id": "string",
-            "raw_placeholder": "string",
-            "label_for_user": "string",
-            "who_should_fill": "company|counterparty|either|system",
-            "expected_type": "string|date|money|state|email|name|title|address|jurisdiction|other",
-            "how_to_fill": "string (1 sentence)",
-            "confidence": "number 0..1",
-            "evidence_quote": "string (short excerpt from provided context)",
-            "location_hint": "string",
-            "ask_user": "boolean"
-        },
-        "placeholders": payload_items
-    }
-
-    resp = client.responses.create(
-        model=model,
-        instructions=SYSTEM_INSTRUCTIONS,
-        input=json.dumps(user_input),
-        # If your model/account supports it, you can push even harder for JSON:
-        # response_format={"type": "json_object"}
+            "context": [ref(d.context_before), ref(d.context_line), ref(d.context_after)],
+        }
+        for d in detected
+    ]
+
+    parts = [
+        f"schema: {orjson.dumps(CLASSIFY_SCHEMA).decode()}",
+        f"lines: {orjson.dumps(list(table)).decode()}",
+        f"items: {len(items)}",
+    ]
+    for i, item in enumerate(items):
+        parts.append(f"### item {i}")
+        parts.append(orjson.dumps(item).decode())
+    return "\n".join(parts)
+
+
+def _parse_llm_fields(text: str, expected: int) -> List[LLMField]:
+    # Expect: {"items": [...]} with one object per input item, in order
+    data = orjson.loads(text.strip())
+    items = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(items, list) or len(items) != expected:
+        got = len(items) if isinstance(items, list) else type(items).__name__
+        raise RuntimeError(f"LLM returned {got} items, expected {expected}")
+
+    try:
+        return _LLM_FIELD_LIST.validate_python(items)
+    except ValidationError as e:
+        # Point at the first offending item, like the old per-object loop did.
+        loc = e.errors()[0]["loc"]
+        obj = items[loc[0]] if loc and isinstance(loc[0], int) else items
+        raise RuntimeError(f"LLM output failed schema validation: {e}\nRaw object: {obj}") from e
+
+
+async def _classify_chunk(
+    client: AsyncOpenAI,
+    sem: asyncio.Semaphore,
+    chunk: List[DetectedField],
+    model: str,
+    use_cache: bool = True,
+) -> List[LLMField]:
+    """
+    Classifies one shard of placeholders; the semaphore caps in-flight requests.
+    """
+    from llm_utils import cached_llm_async, llm_retry
+
+    user = _build_user_input(chunk)
+
+    @llm_retry
+    async def _request() -> str:
+        async with sem:
+            resp = await client.responses.create(
+                model=model,
+                instructions=SYSTEM_INSTRUCTIONS,
+                input=user,
+                text={"format": {"type": "json_object"}},
+            )
+        return resp.output_text
+
+    return await cached_llm_async(
+        model,
+        {"system": SYSTEM_INSTRUCTIONS, "user": user, "temperature": None},
+        _request,
+        parse=lambda text: _parse_llm_fields(text, len(chunk)),
+        enabled=use_cache,
     )
 
-    text = resp.output_text.strip()
-    # Expect: JSON array
-    data = json.loads(text)
 
-    out: List[LLMField] = []
-    for obj in data:
-        try:
-            out.append(LLMField(**obj))
-        except ValidationError as e:
-            raise RuntimeError(f"LLM output failed schema validation: {e}\nRaw object: {obj}") from e
+def _semantic_key(d: DetectedField, model: str) -> str:
+    # Similarity only chooses among entries with the same model, kind and placeholder:
+    # "[Company Name]" and "[Investor Name]" on one boilerplate line embed almost identically.
+    return orjson.dumps([model, d.kind, d.raw_placeholder]).decode()
+
+
+def _semantic_text(d: DetectedField) -> str:
+    # Location is deliberately left out so the same boilerplate matches across documents.
+    return "\n".join([
+        f"kind: {d.kind}",
+        f"placeholder: {d.raw_placeholder}",
+        f"before: {d.context_before}",
+        f"line: {d.context_line}",
+        f"after: {d.context_after}",
+    ])
+
+
+async def call_openai_classify_async(
+    detected: List[DetectedField],
+    model: str = "gpt-5.2",
+    chunk_size: int = CLASSIFY_CHUNK_SIZE,
+    max_concurrency: int = MAX_CONCURRENCY,
+    use_cache: bool = True,
+) -> List[LLMField]:
+    """
+    Shards detected placeholders into chunks and classifies them concurrently.
+    With use_cache, placeholders that are semantically close to a previously
+    classified one reuse that result and are not sent to the chat model.
+    Results keep input order.
+    """
+    if not detected:
+        return []
+
+    import numpy as np
+    from llm_utils import EMBED_BATCH_SIZE, EMBED_MODEL, SemanticCache, llm_retry, new_async_client
+
+    # A fresh client per run, closed on exit: its connection pool is tied to this event loop.
+    # uses OPENAI_API_KEY env var  [oai_citation:2‡OpenAI Platform](https://platform.openai.com/docs/api-reference/introduction?utm_source=chatgpt.com)
+    async with new_async_client() as client:
+        sem = asyncio.Semaphore(max_concurrency)
+
+        results: List[Optional[LLMField]] = [None] * len(detected)
+        semantic: Optional[SemanticCache] = None
+        vecs = None
+        keys: List[str] = []
+        if use_cache:
+            semantic = SemanticCache()
+            keys = [_semantic_key(d, model) for d in detected]
+            texts = [_semantic_text(d) for d in detected]
+            embs = await asyncio.gather(*[
+                llm_retry(client.embeddings.create)(model=EMBED_MODEL, input=texts[i:i + EMBED_BATCH_SIZE])
+                for i in range(0, len(texts), EMBED_BATCH_SIZE)
+            ])
+            vecs = np.array([e.embedding for emb in embs for e in emb.data], dtype=np.float32)
+            for i, hit in enumerate(semantic.lookup(vecs, keys)):
+                if hit is not None:
+                    d = detected[i]
+                    results[i] = LLMField(**hit).model_copy(
+                        update={"raw_placeholder": d.raw_placeholder, "location_hint": d.location_hint}
+                    )
+
+        misses = [i for i, r in enumerate(results) if r is None]
+        if use_cache:
+            print(f"Semantic cache: {len(detected) - len(misses)} hit(s), {len(misses)} miss(es).")
+
+        chunks = [misses[i:i + chunk_size] for i in range(0, len(misses), chunk_size)]
+        chunk_fields = await asyncio.gather(*[
+            _classify_chunk(client, sem, [detected[i] for i in c], model, use_cache) for c in chunks
+        ])
+
+        new_idx: List[int] = []
+        for idxs, fields in zip(chunks, chunk_fields):
+            for i, f in zip(idxs, fields):
+                results[i] = f
+                new_idx.append(i)
+
+        if semantic is not None and vecs is not None:
+            semantic.add(vecs[new_idx], [keys[i] for i in new_idx], [results[i].model_dump() for i in new_idx])
+            semantic.save()
+
+        return [r for r in results if r is not None]
+
+
+def call_openai_classify(
+    detected: List[DetectedField],
+    model: str = "gpt-5.2",
+    use_cache: bool = True,
+) -> List[LLMField]:
+    """
+    Sends detected placeholders to OpenAI and returns one LLMField per placeholder.
+    Synchronous wrapper around call_openai_classify_async.
+    """
+    return asyncio.run(call_openai_classify_async(detected, model=model, use_cache=use_cache))
+
+
+def group_duplicate_fields(detected: List[DetectedField]) -> List[List[DetectedField]]:
+    """
+    Groups detections that would get the same classification: same placeholder, kind
+    and full context (e.g. a signature block repeated verbatim). The surrounding lines
+    are part of the key so "By:" under COMPANY and under INVESTOR stay separate. Order
+    of first occurrence is kept; classify group[0] of each and broadcast with
+    fan_out_fields.
+    """
+    groups: Dict[Tuple[str, str, str, str, str], List[DetectedField]] = defaultdict(list)
+    for d in detected:
+        key = (d.raw_placeholder, d.context_before, d.context_line.strip(), d.context_after, d.kind)
+        groups[key].append(d)
+    return list(groups.values())
+
 
-    return out
+def fan_out_fields(
+    detected: List[DetectedField],
+    groups: List[List[DetectedField]],
+    fields: List[LLMField],
+) -> List[LLMField]:
+    """
+    fields[i] is the classification of groups[i][0]; copies it onto every member and
+    returns one LLMField per entry of detected, in the same order.
+    """
+    by_id: Dict[int, LLMField] = {}
+    for group, f in zip(groups, fields):
+        by_id[id(group[0])] = f
+        for d in group[1:]:
+            by_id[id(d)] = f.model_copy(update={"raw_placeholder": d.raw_placeholder, "location_hint": d.location_hint})
+    return [by_id[id(d)] for d in detected]
+
+
+# -----------------------------
+# 3b) Offline classification (Batch API)
+# -----------------------------
+
+BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def _build_batch_jsonl(detected: List[DetectedField], model: str) -> bytes:
+    """
+    One /v1/responses request per placeholder; custom_id carries the input index.
+    """
+    lines: List[bytes] = []
+    for i, d in enumerate(detected):
+        lines.append(orjson.dumps({
+            "custom_id": f"{d.raw_placeholder}#{i}",
+            "method": "POST",
+            "url": "/v1/responses",
+            "body": {
+                "model": model,
+                "instructions": SYSTEM_INSTRUCTIONS,
+                "input": _build_user_input([d]),
+                "text": {"format": {"type": "json_object"}},
+            },
+        }))
+    return b"\n".join(lines) + b"\n"
+
+
+def _response_body_text(body: Dict[str, Any]) -> str:
+    """
+    Batch output carries the raw Response object, which has no output_text helper.
+    """
+    parts: List[str] = []
+    for item in body.get("output", []):
+        if item.get("type") != "message":
+            continue
+        for c in item.get("content", []):
+            if c.get("type") == "output_text":
+                parts.append(c.get("text", ""))
+    return "".join(parts)
+
+
+def call_openai_classify_batch(
+    detected: List[DetectedField],
+    model: str = "gpt-5.2",
+    poll_seconds: float = 30.0,
+) -> List[LLMField]:
+    """
+    Submits one request per placeholder through the Batch API and blocks until the
+    batch finishes. Half the price of the real-time endpoint and a separate quota,
+    at the cost of latency (completion window is 24h).
+    """
+    if not detected:
+        return []
+
+    from llm_utils import get_client, llm_retry, llm_retry_submit
+
+    client = get_client()
+
+    batch_input = llm_retry_submit(client.files.create)(
+        file=("classify_batch.jsonl", _build_batch_jsonl(detected, model)),
+        purpose="batch",
+    )
+    batch = llm_retry_submit(client.batches.create)(
+        input_file_id=batch_input.id,
+        endpoint="/v1/responses",
+        completion_window="24h",
+    )
+    print(f"Submitted batch {batch.id} ({len(detected)} requests).")
+
+    while batch.status not in BATCH_TERMINAL_STATUSES:
+        time.sleep(poll_seconds)
+        batch = llm_retry(client.batches.retrieve)(batch.id)
+        print(f"Batch {batch.id}: {batch.status}")
+
+    if batch.status != "completed":
+        raise RuntimeError(f"Batch {batch.id} ended with status {batch.status!r}")
+
+    # A "completed" batch can still contain failed requests; those only appear in the
+    # error file, so a silent gap here would misalign results downstream.
+    failed = batch.request_counts.failed if batch.request_counts else 0
+    if failed or batch.error_file_id:
+        sample = ""
+        if batch.error_file_id:
+            sample = "\n".join(llm_retry(client.files.content)(batch.error_file_id).text.splitlines()[:3])
+        raise RuntimeError(f"Batch {batch.id}: {failed} of {len(detected)} requests failed\n{sample}")
+    if not batch.output_file_id:
+        raise RuntimeError(f"Batch {batch.id} completed without an output file")
+
+    by_index: Dict[int, LLMField] = {}
+    for line in llm_retry(client.files.content)(batch.output_file_id).text.splitlines():
+        if not line.strip():
+            continue
+        rec = orjson.loads(line)
+        custom_id = rec.get("custom_id", "")
+        response = rec.get("response") or {}
+        if rec.get("error") or response.get("status_code") != 200:
+            raise RuntimeError(f"Batch request {custom_id} failed: {rec.get('error') or response}")
+
+        by_index[int(custom_id.rsplit("#", 1)[1])] = _parse_llm_fields(_response_body_text(response["body"]), 1)[0]
+
+    if len(by_index) != len(detected):
+        missing = sorted(set(range(len(detected))) - set(by_index))
+        raise RuntimeError(
+            f"Batch {batch.id} returned {len(by_index)} of {len(detected)} results; missing items {missing[:10]}"
+        )
+
+    return [by_index[i] for i in range(len(detected))]
 
 
 # -----------------------------
 # 4) Output writers
 # -----------------------------
 
+def _dump(obj: Any, path: str) -> None:
+    # orjson writes UTF-8 bytes (no ASCII escaping) and serializes dataclasses natively.
+    with open(path, "wb") as f:
+        f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+
 def write_json(fields: List[LLMField], path: str) -> None:
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump([f.model_dump() for f in fields], f, ensure_ascii=False, indent=2)
+    _dump([f.model_dump() for f in fields], path)
 
 def write_csv(fields: List[LLMField], path: str) -> None:
-    rows = [f.model_dump() for f in fields]
-    df = pd.DataFrame(rows)
-    df.to_csv(path, index=False)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(LLMField.model_fields))
+        writer.writeheader()
+        writer.writerows(x.model_dump() for x in fields)
 
 def main():
     import argparse
 
-    parser = argparse.ArgumentParser(description="Extract + classify fillable fields from a .docx legal document.")
-    parser.add_argument("docx_path", help="Path to .docx file")
+    parser = argparse.ArgumentParser(description="Extract + classify fillable fields from .docx legal documents.")
+    parser.add_argument("docx_paths", nargs="+", help="Path(s) or glob(s) of .docx files")
     parser.add_argument("--window", type=int, default=1, help="Context window (lines before/after)")
     parser.add_argument("--model", type=str, default="gpt-5.2", help="OpenAI model name")
     parser.add_argument("--out_json", type=str, default="fields.json", help="Output JSON path")
     parser.add_argument("--out_csv", type=str, default="fields.csv", help="Output CSV path")
     parser.add_argument("--no_llm", action="store_true", help="Only detect fields, do not call LLM (debug mode)")
+    parser.add_argument("--max_concurrency", type=int, default=MAX_CONCURRENCY, help="Max in-flight classify requests")
+    parser.add_argument("--no_cache", action="store_true", help="Bypass the LLM response caches (.llm_cache and semantic_cache.*)")
+    parser.add_argument("--batch", action="store_true", help="Classify via the OpenAI Batch API (cheaper, offline; waits for completion)")
+    parser.add_argument("--batch_poll_seconds", type=float, default=30.0, help="Batch status polling interval")
     args = parser.parse_args()
 
-    detected = detect_fields_from_docx(args.docx_path, window=args.window)
+    docx_paths = [p for arg in args.docx_paths for p in (sorted(glob.glob(arg)) or [arg])]
+    detected = detect_fields_from_docx_many(docx_paths, window=args.window)
     print(f"Detected {len(detected)} candidate placeholders/fields.")
 
     if args.no_llm:
         # Dump raw detections for inspection
         raw_path = "detections.json"
-        with open(raw_path, "w", encoding="utf-8") as f:
-            json.dump([d.__dict__ for d in detected], f, ensure_ascii=False, indent=2)
+        _dump(detected, raw_path)
         print(f"Wrote raw detections to {raw_path}")
         return
 
-    fields = call_openai_classify(detected, model=args.model)
+    groups = group_duplicate_fields(detected)
+    reps = [g[0] for g in groups]
+    print(f"Classifying {len(reps)} unique placeholder contexts.")
+
+    if args.batch:
+        fields = call_openai_classify_batch(reps, model=args.model, poll_seconds=args.batch_poll_seconds)
+    else:
+        fields = asyncio.run(
+            call_openai_classify_async(
+                reps,
+                model=args.model,
+                max_concurrency=args.max_concurrency,
+                use_cache=not args.no_cache,
+            )
+        )
+    fields = fan_out_fields(detected, groups, fields)
+
     write_json(fields, args.out_json)
     write_csv(fields, args.out_csv)
 